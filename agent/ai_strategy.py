@@ -1,24 +1,42 @@
 import logging
 import numpy as np
-import pandas as pd
 import joblib
 from typing import Dict, List, Any, Optional
 import os
-from datetime import datetime
+import sys
+import time
+
+from agent.strategy import FEE_FACTOR_ROUND_TRIP, Opportunity, _argmin_argmax
 
 # Try to import necessary ML libraries
 try:
-    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.ensemble import HistGradientBoostingClassifier
     from sklearn.preprocessing import StandardScaler
     ML_AVAILABLE = True
 except ImportError:
     logging.warning("scikit-learn not available. AI predictions will be disabled.")
     ML_AVAILABLE = False
 
-# Setup logging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+# Optional native tree inference; scikit-learn's predict_proba is used without it
+try:
+    import treelite
+    import treelite.gtil
+    import treelite.sklearn
+    TREELITE_AVAILABLE = True
+except ImportError:
+    TREELITE_AVAILABLE = False
+
 logger = logging.getLogger(__name__)
 
+# Summary statistics stored for every market data record, in column order
+SUMMARY_FEATURES = ['min_price', 'max_price', 'mean_price', 'price_spread', 'price_spread_percent']
+
+def _valid_price_arrays(prices: Dict[str, Optional[float]]):
+    """Split a prices dict into a tuple of exchanges and a parallel float64 array, dropping None values"""
+    keys = tuple(exchange for exchange, price in prices.items() if price is not None)
+    vals = np.fromiter((prices[k] for k in keys), dtype=np.float64, count=len(keys))
+    return keys, vals
+
 class AIArbitrageStrategy:
     """AI-enhanced arbitrage detection strategy"""
     
@@ -26,9 +44,29 @@ class AIArbitrageStrategy:
         self.model = None
         self.scaler = None
         self.ml_enabled = ML_AVAILABLE
-        self.historical_data = []
+        self.feature_names = None
         self.max_history_length = 1000
         
+        # Historical market data kept as a ring buffer: summary stats followed by
+        # one price column per exchange, plus parallel timestamp and token pair columns
+        self._hist = np.zeros((self.max_history_length, len(SUMMARY_FEATURES)), dtype=np.float32)
+        self._hist_ts = np.zeros(self.max_history_length, dtype=np.float64)
+        self._hist_pairs = np.empty(self.max_history_length, dtype=object)
+        self._exchange_cols: Dict[str, int] = {}
+        self._head = 0
+        self._count = 0
+        
+        # Prediction scratch row and feature name -> column lookups, built per model
+        self._feat_idx: Dict[str, int] = {}
+        self._exchange_feat_idx: Dict[str, int] = {}
+        self._scratch = None
+        self._mean = None
+        self._inv_scale = None
+        self._compiled_model = None
+        
+        # Relative spread below which a tick cannot cover fees, so the model is not consulted
+        self._min_gate = 0.003
+        
         # Load model if path provided and ML is available
         if model_path and self.ml_enabled:
             self.load_model(model_path)
@@ -42,6 +80,10 @@ class AIArbitrageStrategy:
                 model_data = joblib.load(model_path)
                 self.model = model_data.get('model')
                 self.scaler = model_data.get('scaler')
+                # Models saved before feature names were persisted carry them on the scaler
+                self.feature_names = model_data.get('feature_names') or list(getattr(self.scaler, 'feature_names_in_', []))
+                self._build_feature_index()
+                self._compile_model()
                 logger.info(f"Successfully loaded AI model from {model_path}")
                 return True
             else:
@@ -52,12 +94,36 @@ class AIArbitrageStrategy:
             self.ml_enabled = False
             return False
     
+    def _build_feature_index(self) -> None:
+        """Precompute feature column lookups, scaler constants and the scratch row used on the prediction path"""
+        self._feat_idx = {name: i for i, name in enumerate(self.feature_names)}
+        self._exchange_feat_idx = {
+            name[:-len('_price')]: i for name, i in self._feat_idx.items()
+            if name.endswith('_price') and name not in SUMMARY_FEATURES
+        }
+        self._scratch = np.zeros((1, len(self._feat_idx)), dtype=np.float32)
+        
+        # Applying the scaler inline avoids scikit-learn's per-call input validation
+        self._mean = self.scaler.mean_.astype(np.float32)
+        self._inv_scale = (1.0 / self.scaler.scale_).astype(np.float32)
+    
+    def _compile_model(self) -> None:
+        """Import the model into treelite so single-row predictions skip scikit-learn's dispatch"""
+        self._compiled_model = None
+        if not TREELITE_AVAILABLE or self.model is None:
+            return
+        try:
+            self._compiled_model = treelite.sklearn.import_model(self.model)
+        except Exception as e:
+            logger.warning(f"Could not compile model with treelite, using scikit-learn inference: {str(e)}")
+    
     def save_model(self, model_path: str) -> bool:
         """Save the current model"""
         try:
             model_data = {
                 'model': self.model,
-                'scaler': self.scaler
+                'scaler': self.scaler,
+                'feature_names': self.feature_names
             }
             joblib.dump(model_data, model_path)
             logger.info(f"Model saved to {model_path}")
@@ -70,33 +136,60 @@ class AIArbitrageStrategy:
         """Record market data for model training"""
         if not prices or len(prices) < 2:
             return
-            
-        # Extract features
-        timestamp = datetime.now()
-        price_list = list(prices.values())
-        spread = max(price_list) - min(price_list)
-        spread_percent = spread / min(price_list) * 100
-        
-        record = {
-            'timestamp': timestamp,
-            'token_pair': token_pair,
-            'min_price': min(price_list),
-            'max_price': max(price_list),
-            'mean_price': sum(price_list) / len(price_list),
-            'price_spread': spread,
-            'price_spread_percent': spread_percent
-        }
         
-        # Add exchange-specific prices
-        for exchange, price in prices.items():
-            record[f'{exchange}_price'] = price
+        keys, vals = _valid_price_arrays(prices)
+        if len(keys) < 2:
+            return
+        
+        self._record_prepared(self._features(vals), token_pair, keys, vals)
+    
+    def _features(self, vals: np.ndarray) -> np.ndarray:
+        """Summary statistics of an array of valid prices, in SUMMARY_FEATURES order"""
+        min_price = vals.min()
+        max_price = vals.max()
+        spread = max_price - min_price
+        return np.array((min_price, max_price, vals.mean(), spread, spread / min_price * 100))
+    
+    def _record_prepared(self, summary: np.ndarray, token_pair: str, keys, vals: np.ndarray) -> None:
+        """Write one record to the history buffer from precomputed summary statistics and valid prices"""
+        for exchange in keys:
+            if exchange not in self._exchange_cols:
+                self._add_exchange_column(exchange)
+        
+        # Overwrite the oldest row once the buffer is full
+        row = self._hist[self._head]
+        row[:len(SUMMARY_FEATURES)] = summary
+        row[len(SUMMARY_FEATURES):] = 0
+        for exchange, price in zip(keys, vals):
+            row[self._exchange_cols[exchange]] = price
+        self._hist_ts[self._head] = time.time()
+        # Interned so every row for a pair references one shared string
+        self._hist_pairs[self._head] = sys.intern(token_pair)
         
-        # Store the data
-        self.historical_data.append(record)
+        self._head = (self._head + 1) % self.max_history_length
+        self._count = min(self._count + 1, self.max_history_length)
+    
+    def _add_exchange_column(self, exchange: str) -> None:
+        """Grow the history buffer by one price column for a newly seen exchange"""
+        self._exchange_cols[exchange] = self._hist.shape[1]
+        self._hist = np.hstack((self._hist, np.zeros((self.max_history_length, 1), dtype=np.float32)))
+    
+    def _history_feature_names(self) -> List[str]:
+        """Feature names matching the columns of the history buffer"""
+        return SUMMARY_FEATURES + [f'{exchange}_price' for exchange in self._exchange_cols]
+    
+    def _build_training_matrix(self, records: List[Dict[str, Any]]):
+        """Build the feature matrix for a list of market data records, missing prices as zero"""
+        exchange_features = sorted({
+            key for record in records for key in record
+            if key.endswith('_price') and key not in SUMMARY_FEATURES
+        })
+        features = SUMMARY_FEATURES + exchange_features
         
-        # Trim history if needed
-        if len(self.historical_data) > self.max_history_length:
-            self.historical_data.pop(0)
+        X = np.zeros((len(records), len(features)), dtype=np.float32)
+        for i, record in enumerate(records):
+            X[i] = [record.get(name) or 0 for name in features]
+        return features, X
     
     def train_model(self, labeled_data: Optional[List[Dict[str, Any]]] = None) -> bool:
         """Train the AI model using historical data"""
@@ -105,85 +198,96 @@ class AIArbitrageStrategy:
             return False
             
         try:
-            # If no labeled data provided, use historical data
-            training_data = labeled_data or self.historical_data
+            if labeled_data:
+                # Prepare data for training
+                features, X = self._build_training_matrix(labeled_data)
+            else:
+                # If no labeled data provided, use historical data directly
+                features = self._history_feature_names()
+                X = self._hist[:self._count]
             
-            if not training_data or len(training_data) < 50:
+            if len(X) < 50:
                 logger.warning("Insufficient data for training. Need at least 50 records.")
                 return False
-                
-            # Prepare data for training
-            df = pd.DataFrame(training_data)
             
             # Create target variable (this would typically come from labeled data)
             # Here we're using a simple heuristic for demonstration
-            df['profitable'] = (df['price_spread_percent'] > 0.5) & (df['max_price'] / df['min_price'] > 1.005)
-            
-            # Select features
-            features = [col for col in df.columns if col not in ['timestamp', 'token_pair', 'profitable']]
-            X = df[features].fillna(0)
-            y = df['profitable']
+            min_col = features.index('min_price')
+            max_col = features.index('max_price')
+            spread_col = features.index('price_spread_percent')
+            y = (X[:, spread_col] > 0.5) & (X[:, max_col] / X[:, min_col] > 1.005)
             
-            # Scale features
+            # Scale features; StandardScaler preserves float32 input
             self.scaler = StandardScaler()
-            X_scaled = self.scaler.fit_transform(X)
+            X_scaled = self.scaler.fit_transform(X.astype(np.float32, copy=False))
+            self.feature_names = features
+            self._build_feature_index()
             
-            # Train model
-            self.model = RandomForestClassifier(n_estimators=100, random_state=42)
+            # Early stopping holds out a stratified validation split, which needs at least two
+            # records of each class; rare-positive histories are trained on in full instead
+            early_stopping = bool(np.bincount(y.astype(np.intp), minlength=2).min() >= 2)
+            
+            # Train model; histogram binning keeps split search linear in the number of records
+            self.model = HistGradientBoostingClassifier(max_iter=200, max_bins=64, early_stopping=early_stopping, random_state=42)
             self.model.fit(X_scaled, y)
+            self._compile_model()
             
-            logger.info(f"Model trained successfully on {len(df)} records")
+            logger.info(f"Model trained successfully on {len(X)} records")
             return True
             
         except Exception as e:
             logger.error(f"Error training model: {str(e)}")
             return False
     
-    def predict_opportunity_success(self, token_pair: str, prices: Dict[str, float]) -> Dict[str, Any]:
+    def predict_opportunity_success(self, token_pair: str, prices: Dict[str, float]) -> Optional[Opportunity]:
         """Predict if an arbitrage opportunity will be successful"""
         # Use traditional method if AI is not available
         if not self.ml_enabled or self.model is None:
             return self._traditional_opportunity_detection(prices)
             
         try:
-            # Prepare input features
-            price_list = list(prices.values())
-            features = {
-                'min_price': min(price_list),
-                'max_price': max(price_list),
-                'mean_price': sum(price_list) / len(price_list),
-                'price_spread': max(price_list) - min(price_list),
-                'price_spread_percent': (max(price_list) - min(price_list)) / min(price_list) * 100
-            }
+            # Filter out None values; a single valid price is no opportunity
+            keys, vals = _valid_price_arrays(prices)
+            if len(keys) < 2:
+                return None
             
-            # Add exchange-specific prices
-            for exchange, price in prices.items():
-                features[f'{exchange}_price'] = price
-                
-            # Convert to DataFrame for prediction
-            df = pd.DataFrame([features])
+            # Prepare input features, shared with the history record below
+            summary = self._features(vals)
             
-            # Fill missing columns with zeros
-            missing_cols = set(self.scaler.feature_names_in_) - set(df.columns)
-            for col in missing_cols:
-                df[col] = 0
-                
-            # Ensure correct column order
-            df = df[self.scaler.feature_names_in_]
+            # Skip the model entirely on ticks whose spread is below the gate
+            if summary[3] / summary[0] < self._min_gate:
+                self._record_prepared(summary, token_pair, keys, vals)
+                return None
+            
+            # Write features into the scratch row; columns unknown to this tick stay zero
+            self._scratch.fill(0)
+            row = self._scratch[0]
+            for name, value in zip(SUMMARY_FEATURES, summary):
+                row[self._feat_idx[name]] = value
+            
+            # Add exchange-specific prices
+            for exchange, price in zip(keys, vals):
+                col = self._exchange_feat_idx.get(exchange)
+                if col is not None:
+                    row[col] = price
                 
             # Scale features
-            X_scaled = self.scaler.transform(df)
+            X_scaled = (self._scratch - self._mean) * self._inv_scale
             
             # Make prediction
-            success_probability = self.model.predict_proba(X_scaled)[0][1]
+            if self._compiled_model is not None:
+                # The positive class probability is the last output for both forest and boosted models
+                success_probability = float(treelite.gtil.predict(self._compiled_model, X_scaled, nthread=1).reshape(-1)[-1])
+            else:
+                success_probability = self.model.predict_proba(X_scaled)[0][1]
             is_profitable = success_probability > 0.7  # Threshold can be adjusted
             
             # Record this data for future training
-            self.record_market_data(token_pair, prices)
+            self._record_prepared(summary, token_pair, keys, vals)
             
             # If the AI predicts profitability, calculate the details
             if is_profitable:
-                return self._calculate_opportunity_details(prices, confidence=success_probability)
+                return self._calculate_opportunity_details(prices, confidence=success_probability, _arrays=(keys, vals))
             else:
                 return None
                 
@@ -192,55 +296,48 @@ class AIArbitrageStrategy:
             # Fall back to traditional method
             return self._traditional_opportunity_detection(prices)
     
-    def _traditional_opportunity_detection(self, prices: Dict[str, float], min_profit_threshold: float = 0.005) -> Optional[Dict[str, Any]]:
+    def _traditional_opportunity_detection(self, prices: Dict[str, float], min_profit_threshold: float = 0.005) -> Optional[Opportunity]:
         """Traditional arbitrage detection (fallback method)"""
         if not prices or len(prices) < 2:
             return None
         
         # Filter out None values
-        valid_prices = {exchange: price for exchange, price in prices.items() if price is not None}
+        keys, vals = _valid_price_arrays(prices)
         
-        if len(valid_prices) < 2:
+        if len(keys) < 2:
             return None
         
-        # Find lowest ask and highest bid
-        lowest_ask = min(valid_prices.items(), key=lambda x: x[1])
-        highest_bid = max(valid_prices.items(), key=lambda x: x[1])
-        
-        # Calculate profit margin (accounting for fees)
-        # Assuming 0.1% fee per trade
-        fee_factor = 0.999  # 1 - 0.001
-        profit_margin = (highest_bid[1] / lowest_ask[1] * fee_factor * fee_factor) - 1
+        # Calculate profit margin between lowest ask and highest bid
+        _, _, lo_p, hi_p = _argmin_argmax(vals)
+        profit_margin = hi_p / lo_p * FEE_FACTOR_ROUND_TRIP - 1
         
         if profit_margin > min_profit_threshold:
-            return self._calculate_opportunity_details(prices)
+            return self._calculate_opportunity_details(prices, _arrays=(keys, vals))
         
         return None
     
-    def _calculate_opportunity_details(self, prices: Dict[str, float], confidence: float = None) -> Dict[str, Any]:
+    def _calculate_opportunity_details(self, prices: Dict[str, float], confidence: float = None,
+                                       _arrays=None) -> Opportunity:
         """Calculate details for an arbitrage opportunity"""
-        valid_prices = {exchange: price for exchange, price in prices.items() if price is not None}
-        lowest_ask = min(valid_prices.items(), key=lambda x: x[1])
-        highest_bid = max(valid_prices.items(), key=lambda x: x[1])
-        
-        # Calculate profit margin (accounting for fees)
-        fee_factor = 0.999  # 1 - 0.001
-        profit_margin = (highest_bid[1] / lowest_ask[1] * fee_factor * fee_factor) - 1
-        
-        opportunity = {
-            "buy_exchange": lowest_ask[0],
-            "buy_price": lowest_ask[1],
-            "sell_exchange": highest_bid[0],
-            "sell_price": highest_bid[1],
-            "profit_margin": profit_margin,
-            "estimated_profit_percent": profit_margin * 100
-        }
+        keys, vals = _arrays if _arrays is not None else _valid_price_arrays(prices)
         
-        # Add AI confidence if available
-        if confidence is not None:
-            opportunity["ai_confidence"] = confidence
-            
-        return opportunity
+        # Find lowest ask and highest bid
+        i_lo, i_hi, lo_p, hi_p = _argmin_argmax(vals)
+        lo_p = float(lo_p)
+        hi_p = float(hi_p)
+        
+        profit_margin = hi_p / lo_p * FEE_FACTOR_ROUND_TRIP - 1
+        
+        # AI confidence is only set when a model scored the opportunity
+        return Opportunity(
+            buy_exchange=keys[i_lo],
+            buy_price=lo_p,
+            sell_exchange=keys[i_hi],
+            sell_price=hi_p,
+            profit_margin=profit_margin,
+            estimated_profit_percent=profit_margin * 100,
+            ai_confidence=confidence
+        )
 
 # Create instance for export
 ai_strategy = AIArbitrageStrategy()
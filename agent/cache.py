@@ -0,0 +1,70 @@
+import functools
+import logging
+import orjson
+import os
+import time
+
+CACHE_DIR = ".cache"
+
+class FileCache:
+    """
+    Simple on-disk JSON cache. Entries live in <directory>/<key>.json and expire by file age.
+    Payloads are read and written as raw bytes with orjson, skipping a separate UTF-8 decode.
+    """
+
+    def __init__(self, directory=CACHE_DIR):
+        self.directory = directory
+        self._directory_ready = False
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get(self, key, ttl):
+        """Return the cached value for key, or None if it is missing or older than ttl seconds"""
+        path = self._path(key)
+        try:
+            if time.time() - os.path.getmtime(path) > ttl:
+                return None
+            with open(path, 'rb') as f:
+                return orjson.loads(f.read())
+        except (OSError, orjson.JSONDecodeError):
+            return None
+
+    def set(self, key, value):
+        """Store value under key, replacing the file atomically"""
+        if not self._directory_ready:
+            os.makedirs(self.directory, exist_ok=True)
+            self._directory_ready = True
+        path = self._path(key)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(orjson.dumps(value))
+        os.replace(tmp_path, path)
+
+_file_cache = FileCache()
+
+def cached(ttl, key=None):
+    """
+    Cache the result of an async function on disk for ttl seconds
+
+    The cache key is the function name unless given, so call arguments are not
+    part of it. None results are treated as failures and never cached.
+    """
+    def decorator(func):
+        cache_key = key or func.__name__
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            value = _file_cache.get(cache_key, ttl)
+            if value is not None:
+                logging.info(f"Loaded {cache_key} from {CACHE_DIR}")
+                return value
+            value = await func(*args, **kwargs)
+            if value is not None:
+                try:
+                    _file_cache.set(cache_key, value)
+                except OSError as e:
+                    logging.warning(f"Could not write {cache_key} to cache: {e}")
+            return value
+        return wrapper
+    return decorator
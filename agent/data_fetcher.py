@@ -1,20 +1,135 @@
-import requests
+import asyncio
+import aiohttp
 import logging
+import orjson
 import time
 
-# Setup logging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+from agent.cache import cached
 
-def fetch_spot_markets(retries=3, retry_delay=1):
-    """Fetch all available spot markets from Injective"""
-    # Try different Injective endpoints
-    endpoints = [
-        "https://sentry.injective.network/api/explorer/v1/spot_markets",
-        "https://api.injective.exchange/api/explorer/v1/spot_markets", 
-        "https://k8s.mainnet.injective.network/api/explorer/v1/spot_markets",
-        # Testnet alternative
-        "https://testnet.sentry.injective.network/api/explorer/v1/spot_markets"
-    ]
+# Pooled keep-alive HTTP session, reused across calls so TCP and TLS setup is only paid once per host
+_session = None
+_session_loop = None
+
+# Requests in flight per exchange, so many pairs polled at once stay under rate limits
+EXCHANGE_CONCURRENCY = 4
+_exchange_sems = {}
+_exchange_sems_loop = None
+
+# Event loop kept alive between calls to the synchronous facades, so they can reuse the pooled session
+_sync_loop = None
+
+def _get_session():
+    """Return the pooled session for the running event loop, creating it on first use"""
+    global _session, _session_loop
+    loop = asyncio.get_running_loop()
+    if _session is None or _session.closed or _session_loop is not loop:
+        connector = aiohttp.TCPConnector(limit=50, limit_per_host=8, ttl_dns_cache=300, keepalive_timeout=60)
+        _session = aiohttp.ClientSession(connector=connector)
+        _session_loop = loop
+    return _session
+
+def _exchange_semaphore(exchange):
+    """Return the request semaphore for an exchange, created per event loop like the session"""
+    global _exchange_sems, _exchange_sems_loop
+    loop = asyncio.get_running_loop()
+    if _exchange_sems_loop is not loop:
+        _exchange_sems = {}
+        _exchange_sems_loop = loop
+    semaphore = _exchange_sems.get(exchange)
+    if semaphore is None:
+        semaphore = _exchange_sems[exchange] = asyncio.Semaphore(EXCHANGE_CONCURRENCY)
+    return semaphore
+
+async def _with_exchange_slot(exchange, fetch, *args):
+    """Call the async fetch(*args) while holding one of the exchange's request slots"""
+    async with _exchange_semaphore(exchange):
+        return await fetch(*args)
+
+async def close_session():
+    """Close the pooled HTTP session"""
+    global _session
+    if _session is not None and not _session.closed:
+        await _session.close()
+    _session = None
+
+def _run_sync(coro):
+    """Run a coroutine on the persistent facade event loop"""
+    global _sync_loop
+    if _sync_loop is None or _sync_loop.is_closed():
+        _sync_loop = asyncio.new_event_loop()
+    return _sync_loop.run_until_complete(coro)
+
+async def _fetch_first_ok(urls, timeout=10, session=None):
+    """
+    Request all URLs concurrently and return the parsed JSON of the first 200 response.
+    Remaining requests are cancelled once one succeeds. Returns None if none succeed.
+    Uses the given session, or the module's pooled session if none is passed.
+    """
+    if session is None:
+        session = _get_session()
+    client_timeout = aiohttp.ClientTimeout(total=timeout)
+    
+    async def _get(url):
+        async with session.get(url, timeout=client_timeout) as response:
+            if response.status != 200:
+                logging.warning(f"Request to {url} failed: {response.status}")
+                return None
+            return orjson.loads(await response.read())
+    
+    tasks = [asyncio.create_task(_get(url)) for url in urls]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            try:
+                data = await next_done
+            except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+                logging.warning(f"Request failed: {e}")
+                continue
+            if data is not None:
+                return data
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+    return None
+
+# Spot markets change rarely, so they are cached together with a ticker -> market ID map
+# and the set of listed tickers
+_MARKETS_TTL = 300
+_markets_cache = {'data': None, 'ts': 0.0, 'by_ticker': {}, 'tickers': frozenset()}
+_markets_refresh = None
+
+async def fetch_spot_markets_async(retries=3, retry_delay=1, session=None):
+    """Fetch all available spot markets from Injective, served from cache for up to _MARKETS_TTL seconds"""
+    global _markets_refresh
+    if _markets_cache['data'] is not None and time.monotonic() - _markets_cache['ts'] < _MARKETS_TTL:
+        return _markets_cache['data']
+    
+    # Concurrent callers share one in-flight refresh. It is shielded so a caller
+    # cancelled by a price deadline does not abort the refresh for everyone else.
+    if (_markets_refresh is None or _markets_refresh.done()
+            or _markets_refresh.get_loop() is not asyncio.get_running_loop()):
+        _markets_refresh = asyncio.create_task(_refresh_spot_markets(retries, retry_delay, session))
+    return await asyncio.shield(_markets_refresh)
+
+async def _refresh_spot_markets(retries, retry_delay, session=None):
+    """Refetch spot markets and rebuild the cache"""
+    data = await _fetch_spot_markets_uncached(retries, retry_delay, session)
+    _markets_cache['data'] = data
+    _markets_cache['ts'] = time.monotonic()
+    _markets_cache['by_ticker'] = {
+        market['ticker'].replace('/', ''): market['marketId']
+        for market in data.get('data', []) if market.get('ticker')
+    }
+    _markets_cache['tickers'] = frozenset(
+        market['ticker'] for market in data.get('data', []) if market.get('ticker')
+    )
+    return data
+
+async def _fetch_spot_markets_uncached(retries, retry_delay, session=None):
+    """Fetch all available spot markets from Injective, falling back to mock data"""
+    data = await _download_spot_markets(retries, retry_delay, session)
+    if data is not None:
+        return data
     
     # Use local mock data if network is unavailable
     mock_data = {
@@ -25,32 +140,41 @@ def fetch_spot_markets(retries=3, retry_delay=1):
         ]
     }
     
-    last_error = None
-    for endpoint in endpoints:
-        for attempt in range(retries):
-            try:
-                logging.info(f"Attempting to fetch spot markets from {endpoint}")
-                response = requests.get(endpoint, timeout=10)
-                
-                if response.status_code == 200:
-                    logging.info("Successfully fetched spot markets")
-                    return response.json()
-                else:
-                    logging.warning(f"Failed to fetch spot markets: {response.status_code}")
-            
-            except requests.exceptions.RequestException as e:
-                logging.warning(f"Request failed: {e}")
-                last_error = e
-                if attempt < retries - 1:
-                    logging.info(f"Retrying in {retry_delay} seconds...")
-                    time.sleep(retry_delay)
-    
     # If all endpoints fail, use mock data for development
-    logging.error(f"All endpoints failed. Last error: {last_error}")
+    logging.error("All endpoints failed")
     logging.info("Using mock data for development purposes")
     return mock_data
 
-def fetch_market_prices(market_id):
+# The market list changes at most daily, so downloads are kept on disk across restarts
+@cached(ttl=3600, key="spot_markets")
+async def _download_spot_markets(retries, retry_delay, session=None):
+    """Download spot markets from Injective. Returns None if every endpoint fails."""
+    # Try different Injective endpoints
+    endpoints = [
+        "https://sentry.injective.network/api/explorer/v1/spot_markets",
+        "https://api.injective.exchange/api/explorer/v1/spot_markets", 
+        "https://k8s.mainnet.injective.network/api/explorer/v1/spot_markets",
+        # Testnet alternative
+        "https://testnet.sentry.injective.network/api/explorer/v1/spot_markets"
+    ]
+    
+    for attempt in range(retries):
+        logging.info("Attempting to fetch spot markets")
+        data = await _fetch_first_ok(endpoints, session=session)
+        if data is not None:
+            logging.info("Successfully fetched spot markets")
+            return data
+        if attempt < retries - 1:
+            logging.info(f"Retrying in {retry_delay} seconds...")
+            await asyncio.sleep(retry_delay)
+    return None
+
+async def fetch_available_tickers_async(session=None):
+    """Return the frozenset of tickers (e.g. "INJ/USDT") listed as Injective spot markets"""
+    await fetch_spot_markets_async(session=session)
+    return _markets_cache['tickers']
+
+async def fetch_market_prices_async(market_id, session=None):
     """Fetch current prices for a specific market"""
     # Mock data for development when network is unavailable
     mock_prices = {
@@ -86,36 +210,47 @@ def fetch_market_prices(market_id):
         f"https://testnet.sentry.injective.network/api/explorer/v1/orderbook/spot/{market_id}"
     ]
     
-    for endpoint in endpoints:
-        try:
-            response = requests.get(endpoint, timeout=10)
-            
-            if response.status_code == 200:
-                data = response.json()
-                if data.get('data'):
-                    buys = data['data'].get('buys', [])
-                    sells = data['data'].get('sells', [])
-                    
-                    best_bid = float(buys[0]['price']) if buys else None
-                    best_ask = float(sells[0]['price']) if sells else None
-                    
-                    return {
-                        'market_id': market_id,
-                        'best_bid': best_bid,
-                        'best_ask': best_ask,
-                        'mid_price': (best_bid + best_ask) / 2 if (best_bid and best_ask) else None
-                    }
-        except Exception as e:
-            logging.warning(f"Failed to fetch price data for {market_id}: {e}")
+    data = await _fetch_first_ok(endpoints, session=session)
+    if data and data.get('data'):
+        buys = data['data'].get('buys', [])
+        sells = data['data'].get('sells', [])
+        
+        best_bid = float(buys[0]['price']) if buys else None
+        best_ask = float(sells[0]['price']) if sells else None
+        
+        return {
+            'market_id': market_id,
+            'best_bid': best_bid,
+            'best_ask': best_ask,
+            'mid_price': (best_bid + best_ask) / 2 if (best_bid and best_ask) else None
+        }
     
     # If all endpoints fail, return None
     logging.error(f"Could not fetch price data for market {market_id}")
     return None
 
-def fetch_prices_across_exchanges(token_pair):
+class PriceSnapshot(dict):
+    """Exchange -> price mapping whose stale set names exchanges served from the last-good cache"""
+    __slots__ = ('stale',)
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stale = set()
+
+# Last good price per (exchange, token pair) as (price, monotonic timestamp).
+# Prices younger than PRICE_TTL are reused without a request; when a fetch fails,
+# prices younger than PRICE_STALE_TTL stand in for it, marked stale.
+PRICE_TTL = 2.0
+PRICE_STALE_TTL = 10.0
+_last_prices = {}
+
+async def fetch_prices_across_exchanges_async(token_pair, session=None, skip=()):
     """
     Compare prices for the same token pair across different exchanges
     token_pair should be in format like "INJ/USDT"
+    session is an optional aiohttp.ClientSession owned by the caller
+    skip names exchanges to leave out, e.g. ones whose prices are streamed instead
+    Returns a PriceSnapshot, whose stale set lists exchanges that fell back to a cached price
     """
     # For development/offline mode, use mock data
     mock_prices = {
@@ -139,47 +274,127 @@ def fetch_prices_across_exchanges(token_pair):
     # Check if we have mock data for this token pair
     if token_pair in mock_prices:
         logging.info(f"Using mock cross-exchange price data for {token_pair}")
-        return mock_prices[token_pair]
+        return {exchange: price for exchange, price in mock_prices[token_pair].items() if exchange not in skip}
     
-    # Try to get Injective price
-    try:
-        injective_price = fetch_injective_price(token_pair)
+    prices = PriceSnapshot()
+    now = time.monotonic()
+    
+    # Prices fetched within PRICE_TTL are reused as they are
+    tasks = {}
+    for exchange, fetch_price in EXCHANGE_PRICE_FETCHERS.items():
+        if exchange in skip:
+            continue
+        cached = _last_prices.get((exchange, token_pair))
+        if cached is not None and now - cached[1] < PRICE_TTL:
+            prices[exchange] = cached[0]
+        else:
+            tasks[exchange] = asyncio.create_task(_with_exchange_slot(exchange, fetch_price, token_pair, session))
+    
+    # Query the remaining exchanges at once; venues that miss the deadline are left out of this tick
+    done, pending = set(), set()
+    if tasks:
+        done, pending = await asyncio.wait(tasks.values(), timeout=CROSS_EXCHANGE_DEADLINE)
+    for task in pending:
+        task.cancel()
+    if pending:
+        await asyncio.gather(*pending, return_exceptions=True)
+    
+    now = time.monotonic()
+    for exchange, task in tasks.items():
+        if task not in done:
+            logging.warning(f"{exchange} price for {token_pair} missed the {CROSS_EXCHANGE_DEADLINE}s deadline")
+        elif task.exception() is not None:
+            logging.error(f"Error fetching {exchange} price for {token_pair}: {task.exception()}")
+        elif task.result() is not None:
+            prices[exchange] = task.result()
+            _last_prices[(exchange, token_pair)] = (prices[exchange], now)
+            continue
         
-        # If successful, simulate prices from other exchanges
-        if injective_price:
-            # In a real implementation, you'd fetch these from other exchange APIs
-            other_prices = {
-                "injective": injective_price,
-                "binance": injective_price * 0.998,  # Simulated price difference
-                "kucoin": injective_price * 1.002    # Simulated price difference
-            }
-            return other_prices
-    except Exception as e:
-        logging.error(f"Error fetching cross-exchange prices: {e}")
+        # Fall back to the last good price for a short outage, flagged as stale
+        cached = _last_prices.get((exchange, token_pair))
+        if cached is not None and now - cached[1] < PRICE_STALE_TTL:
+            prices[exchange] = cached[0]
+            prices.stale.add(exchange)
+    
+    if prices:
+        return prices
     
     # If all else fails, return None
     logging.warning(f"Could not fetch cross-exchange prices for {token_pair}")
     return None
 
-def fetch_injective_price(token_pair):
+async def fetch_injective_price_async(token_pair, session=None):
     """Get current price for a token pair on Injective"""
-    # Get markets
-    markets = fetch_spot_markets()
+    # Make sure the market cache is populated
+    await fetch_spot_markets_async(session=session)
     
-    if not markets or 'data' not in markets:
-        return None
-        
     # Find the market ID for this token pair
-    for market in markets['data']:
-        ticker = market.get('ticker')
-        if ticker and ticker.replace('/', '') == token_pair.replace('/', ''):
-            market_id = market['marketId']
-            price_data = fetch_market_prices(market_id)
-            return price_data['mid_price'] if price_data else None
-            
-    return None
+    market_id = _markets_cache['by_ticker'].get(token_pair.replace('/', ''))
+    if market_id is None:
+        return None
+    
+    price_data = await fetch_market_prices_async(market_id, session)
+    return price_data['mid_price'] if price_data else None
+
+async def fetch_all_prices_async(token_pairs, session=None, skip=()):
+    """
+    Fetch cross-exchange prices for several token pairs concurrently, leaving out the exchanges in skip.
+    Returns a dict of token pair -> prices, with None for pairs that could not be fetched.
+    """
+    results = await asyncio.gather(
+        *[fetch_prices_across_exchanges_async(token_pair, session, skip) for token_pair in token_pairs],
+        return_exceptions=True
+    )
+    
+    prices_by_pair = {}
+    for token_pair, result in zip(token_pairs, results):
+        if isinstance(result, Exception):
+            logging.error(f"Error fetching prices for {token_pair}: {result}")
+            result = None
+        prices_by_pair[token_pair] = result
+    return prices_by_pair
+
+async def _binance_price(token_pair, session=None):
+    """Get the last traded price for a token pair on Binance"""
+    symbol = token_pair.replace('/', '')
+    data = await _fetch_first_ok([f"https://api.binance.com/api/v3/ticker/price?symbol={symbol}"], session=session)
+    return float(data['price']) if data and 'price' in data else None
+
+async def _kucoin_price(token_pair, session=None):
+    """Get the last traded price for a token pair on KuCoin"""
+    symbol = token_pair.replace('/', '-')
+    data = await _fetch_first_ok([f"https://api.kucoin.com/api/v1/market/orderbook/level1?symbol={symbol}"], session=session)
+    return float(data['data']['price']) if data and data.get('data') else None
+
+# Price sources compared for every token pair
+EXCHANGE_PRICE_FETCHERS = {
+    "injective": fetch_injective_price_async,
+    "binance": _binance_price,
+    "kucoin": _kucoin_price
+}
+
+# Overall time budget for one cross-exchange price snapshot, in seconds
+CROSS_EXCHANGE_DEADLINE = 0.5
+
+# Synchronous facades for callers without an event loop
+def fetch_spot_markets(retries=3, retry_delay=1):
+    return _run_sync(fetch_spot_markets_async(retries, retry_delay))
+
+def fetch_market_prices(market_id):
+    return _run_sync(fetch_market_prices_async(market_id))
+
+def fetch_prices_across_exchanges(token_pair):
+    return _run_sync(fetch_prices_across_exchanges_async(token_pair))
+
+def fetch_injective_price(token_pair):
+    return _run_sync(fetch_injective_price_async(token_pair))
+
+def fetch_all_prices(token_pairs):
+    return _run_sync(fetch_all_prices_async(token_pairs))
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    
     # Test the functions
     markets = fetch_spot_markets()
     if markets and 'data' in markets:
@@ -0,0 +1,71 @@
+import atexit
+import logging
+import os
+import queue
+from logging.handlers import (
+    MemoryHandler, QueueHandler, QueueListener, RotatingFileHandler, TimedRotatingFileHandler
+)
+
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+LOG_DIR = "logs"
+
+# Logger whose records are also kept in the dedicated trade log
+TRADE_LOGGER = "agent.trade_executor"
+
+# Trade log records buffered in memory before they are written out together
+TRADE_LOG_BUFFER = 32
+
+_configured = False
+
+def configure_logging(level=logging.INFO, log_file=None):
+    """
+    Set up logging handlers for the whole process
+
+    Agent modules only create loggers; this should be called once by the entry
+    point (main.py / app.py). Later calls are no-ops.
+
+    Args:
+        level: Root logging level
+        log_file: Optional file name under logs/ that receives all records; it is
+            rotated at midnight and the last 14 days are kept
+    """
+    global _configured
+    if _configured:
+        return
+    _configured = True
+
+    os.makedirs(LOG_DIR, exist_ok=True)
+    formatter = logging.Formatter(LOG_FORMAT)
+
+    handlers = [logging.StreamHandler()]
+    if log_file:
+        handlers.append(TimedRotatingFileHandler(
+            os.path.join(LOG_DIR, log_file), when="midnight", backupCount=14, encoding="utf-8"
+        ))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    # Trades also go to their own size-capped log. Writes are batched: the buffer
+    # is flushed when full, on any ERROR, and by logging.shutdown() at exit.
+    trade_handler = RotatingFileHandler(
+        os.path.join(LOG_DIR, "trades.log"), maxBytes=10_000_000, backupCount=5
+    )
+    trade_handler.setFormatter(formatter)
+    buffered_handler = MemoryHandler(TRADE_LOG_BUFFER, flushLevel=logging.ERROR, target=trade_handler)
+    buffered_handler.addFilter(logging.Filter(TRADE_LOGGER))
+    handlers.append(buffered_handler)
+
+    # File and console I/O happen on the listener's thread. The calling thread
+    # still runs QueueHandler.prepare(), which interpolates the message args and
+    # renders any traceback; only the LOG_FORMAT/asctime step is left to the
+    # listener, so the queue side keeps the bare message. Expensive __str__ calls
+    # in log arguments therefore still cost the caller. force replaces any handler
+    # a module-level logging.warning() call may have installed implicitly before
+    # this point.
+    log_queue = queue.SimpleQueue()
+    logging.basicConfig(level=level, format='%(message)s', handlers=[QueueHandler(log_queue)], force=True)
+    listener = QueueListener(log_queue, *handlers)
+    listener.start()
+    # Registered after logging's own shutdown hook, so it runs first and drains
+    # the queue before the handlers are flushed and closed
+    atexit.register(listener.stop)
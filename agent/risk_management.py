@@ -1,6 +1,14 @@
 import logging
+import time
+import numpy as np
 from datetime import datetime, timedelta
 
+# Length of the risk window in seconds
+RESET_PERIOD = 86400.0
+
+# Row layout of the trade history buffer; ts is on the monotonic clock
+TRADE_DTYPE = np.dtype([('ts', 'f8'), ('success', '?'), ('profit', 'f4')])
+
 class RiskManager:
     def __init__(self, max_trade_amount=1.0, max_daily_loss=0.5, max_trade_count=10):
         """
@@ -18,8 +26,15 @@ class RiskManager:
         # Track trading activity
         self.daily_profit_loss = 0
         self.trade_count = 0
-        self.trades_history = []
-        self.reset_time = datetime.now() + timedelta(days=1)
+        
+        # Fixed-size ring buffer holding roughly 30 days of trades at the daily cap
+        self._trades = np.zeros(max_trade_count * 30, dtype=TRADE_DTYPE)
+        self._head = 0
+        self._count = 0
+        
+        # Current risk window on the monotonic clock; daily P/L covers trades since _window_start
+        self._window_start = time.monotonic()
+        self._reset_at = self._window_start + RESET_PERIOD
         
         logging.info(f"Risk manager initialized with max trade: ${max_trade_amount}, " +
                     f"max daily loss: ${max_daily_loss}, max trades: {max_trade_count}")
@@ -79,26 +94,32 @@ class RiskManager:
         """Record the result of a trade for risk management purposes"""
         self._check_reset_period()
         
-        # Update counters
-        self.trade_count += 1
-        self.daily_profit_loss += profit
-        
         # Record trade details
-        trade_record = {
-            'timestamp': datetime.now(),
-            'success': success,
-            'profit': profit
-        }
-        self.trades_history.append(trade_record)
+        self._trades[self._head] = (time.monotonic(), success, profit)
+        self._head = (self._head + 1) % len(self._trades)
+        self._count = min(self._count + 1, len(self._trades))
+        
+        # Update counters; P/L is summed from the trade log, so it never drifts
+        self.trade_count += 1
+        self.daily_profit_loss = self._window_profit()
         
         logging.info(f"Trade recorded: success={success}, profit=${profit:.2f}, " +
                     f"daily P/L=${self.daily_profit_loss:.2f}, trade count={self.trade_count}/{self.max_trade_count}")
     
     def _check_reset_period(self):
         """Check if we need to reset our daily counters"""
-        now = datetime.now()
-        if now >= self.reset_time:
-            logging.info("Resetting daily risk management counters")
-            self.daily_profit_loss = 0
+        now = time.monotonic()
+        if now >= self._reset_at:
+            next_reset = datetime.now() + timedelta(seconds=RESET_PERIOD)
+            logging.info(f"Resetting daily risk management counters. Next reset at {next_reset:%Y-%m-%d %H:%M:%S}")
             self.trade_count = 0
-            self.reset_time = now + timedelta(days=1)
\ No newline at end of file
+            
+            # The new window starts at the deadline that just passed
+            self._window_start = self._reset_at
+            self._reset_at = now + RESET_PERIOD
+            self.daily_profit_loss = self._window_profit()
+    
+    def _window_profit(self):
+        """Sum the profits of trades in the current window with one vectorized pass over the trade log"""
+        trades = self._trades[:self._count]
+        return float(trades['profit'][trades['ts'] >= self._window_start].sum())
\ No newline at end of file
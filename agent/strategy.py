@@ -1,49 +1,175 @@
 import logging
+import numpy as np
+from dataclasses import dataclass
+from typing import Optional
 
-# Setup logging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+# Try to import numba to compile the numeric kernels
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+    
+    def njit(*args, **kwargs):
+        """Fallback that leaves kernels as plain NumPy code"""
+        def decorator(func):
+            return func
+        return decorator
+
+# 0.1% fee on both legs of the trade, pre-folded: 0.999 * 0.999
+FEE_FACTOR_ROUND_TRIP = 0.998001
+
+@dataclass(slots=True)
+class Opportunity:
+    """A detected arbitrage opportunity: buy on one exchange, sell on another"""
+    buy_exchange: str
+    buy_price: float
+    sell_exchange: str
+    sell_price: float
+    profit_margin: float
+    estimated_profit_percent: float
+    # Set by the AI strategy when a model scored the opportunity
+    ai_confidence: Optional[float] = None
+
+@njit(fastmath=True, cache=True)
+def _argmin_argmax(vals):
+    """Return (imin, imax, vals[imin], vals[imax]) for a 1-D price array"""
+    imin = np.argmin(vals)
+    imax = np.argmax(vals)
+    return imin, imax, vals[imin], vals[imax]
+
+@njit(cache=True)
+def _depth_nb(prices, quantities, trade_size):
+    """Effective price of filling trade_size against the given levels, NaN if the book is too thin"""
+    cumulative = np.cumsum(quantities)
+    idx = np.searchsorted(cumulative, trade_size)
+    if idx == len(prices):
+        return np.nan
+    filled = cumulative[idx - 1] if idx > 0 else 0.0
+    total_cost = np.sum(prices[:idx] * quantities[:idx]) + prices[idx] * (trade_size - filled)
+    return total_cost / trade_size
+
+def _is_mixed_freshness(prices, buy_exchange, sell_exchange):
+    """True if exactly one leg is a stale cached price (see data_fetcher.PriceSnapshot)"""
+    stale = getattr(prices, 'stale', None)
+    return bool(stale) and ((buy_exchange in stale) != (sell_exchange in stale))
+
+def _best_same_freshness(prices, min_profit_threshold):
+    """Best opportunity whose legs are both fresh or both stale"""
+    fresh, stale = {}, {}
+    for exchange, price in prices.items():
+        (stale if exchange in prices.stale else fresh)[exchange] = price
+    
+    candidates = [detect_arbitrage_opportunity(subset, min_profit_threshold) for subset in (fresh, stale)]
+    return max(filter(None, candidates), key=lambda opportunity: opportunity.profit_margin, default=None)
 
 def detect_arbitrage_opportunity(prices, min_profit_threshold=0.005):
     """
     Checks for arbitrage opportunities across exchanges.
     
+    A stale price is only matched against other stale prices, never against a
+    fresh one, since the two were observed at different times.
+    
     Args:
         prices: Dictionary with exchange names as keys and prices as values
         min_profit_threshold: Minimum profit margin required (0.5% by default)
         
     Returns:
-        Dictionary with arbitrage details if found, None otherwise
+        Opportunity if found, None otherwise
     """
     if not prices or len(prices) < 2:
         return None
     
     # Filter out None values
-    valid_prices = {exchange: price for exchange, price in prices.items() if price is not None}
+    exchanges = [exchange for exchange, price in prices.items() if price is not None]
     
-    if len(valid_prices) < 2:
+    if len(exchanges) < 2:
         return None
     
-    # Find lowest ask and highest bid
-    lowest_ask = min(valid_prices.items(), key=lambda x: x[1])
-    highest_bid = max(valid_prices.items(), key=lambda x: x[1])
-    
-    # Calculate profit margin (accounting for fees)
-    # Assuming 0.1% fee per trade
-    fee_factor = 0.999  # 1 - 0.001
-    profit_margin = (highest_bid[1] / lowest_ask[1] * fee_factor * fee_factor) - 1
+    # Find lowest ask and highest bid, and the profit margin after fees
+    vals = np.fromiter((prices[exchange] for exchange in exchanges), dtype=np.float64, count=len(exchanges))
+    buy_idx, sell_idx, buy_price, sell_price = _argmin_argmax(vals)
+    profit_margin = float(sell_price / buy_price * FEE_FACTOR_ROUND_TRIP - 1)
     
     if profit_margin > min_profit_threshold:
-        return {
-            "buy_exchange": lowest_ask[0],
-            "buy_price": lowest_ask[1],
-            "sell_exchange": highest_bid[0],
-            "sell_price": highest_bid[1],
-            "profit_margin": profit_margin,
-            "estimated_profit_percent": profit_margin * 100
-        }
+        if _is_mixed_freshness(prices, exchanges[buy_idx], exchanges[sell_idx]):
+            return _best_same_freshness(prices, min_profit_threshold)
+        
+        return Opportunity(
+            buy_exchange=exchanges[buy_idx],
+            buy_price=float(buy_price),
+            sell_exchange=exchanges[sell_idx],
+            sell_price=float(sell_price),
+            profit_margin=profit_margin,
+            estimated_profit_percent=profit_margin * 100
+        )
     
     return None
 
+def detect_arbitrage_opportunities(prices_by_pair, min_profit_threshold=0.005):
+    """
+    Checks many token pairs for arbitrage opportunities at once.
+    
+    Prices are stacked into a (pairs, exchanges) array so the best buy/sell
+    exchanges and the margins of every pair come from a few vectorized
+    operations. Results match calling detect_arbitrage_opportunity per pair,
+    except that exact price ties may pick a different exchange when pairs list
+    their exchanges in different orders.
+    
+    Args:
+        prices_by_pair: Dictionary of token pair -> {exchange: price}; pairs without prices may be None
+        min_profit_threshold: Minimum profit margin required (0.5% by default)
+        
+    Returns:
+        Dictionary of token pair -> Opportunity, only for pairs with an opportunity
+    """
+    pairs = [token_pair for token_pair, prices in prices_by_pair.items() if prices]
+    if not pairs:
+        return {}
+    
+    # Exchange columns in first-seen order, so ties resolve like the per-pair version
+    exchanges = list(dict.fromkeys(exchange for token_pair in pairs for exchange in prices_by_pair[token_pair]))
+    column = {exchange: j for j, exchange in enumerate(exchanges)}
+    
+    # Missing quotes are NaN and never win either side
+    A = np.full((len(pairs), len(exchanges)), np.nan)
+    for i, token_pair in enumerate(pairs):
+        for exchange, price in prices_by_pair[token_pair].items():
+            if price is not None:
+                A[i, column[exchange]] = price
+    
+    missing = np.isnan(A)
+    rows = np.arange(len(pairs))
+    buy_idx = np.where(missing, np.inf, A).argmin(axis=1)
+    sell_idx = np.where(missing, -np.inf, A).argmax(axis=1)
+    buy_prices = A[rows, buy_idx]
+    sell_prices = A[rows, sell_idx]
+    profit_margins = sell_prices / buy_prices * FEE_FACTOR_ROUND_TRIP - 1
+    
+    # Pairs need quotes from at least two exchanges
+    hits = np.flatnonzero(((~missing).sum(axis=1) >= 2) & (profit_margins > min_profit_threshold))
+    
+    opportunities = {}
+    for i in hits:
+        prices = prices_by_pair[pairs[i]]
+        if _is_mixed_freshness(prices, exchanges[buy_idx[i]], exchanges[sell_idx[i]]):
+            # Rare case: redo this pair without mixing stale and fresh legs
+            opportunity = _best_same_freshness(prices, min_profit_threshold)
+            if opportunity:
+                opportunities[pairs[i]] = opportunity
+            continue
+        
+        profit_margin = float(profit_margins[i])
+        opportunities[pairs[i]] = Opportunity(
+            buy_exchange=exchanges[buy_idx[i]],
+            buy_price=float(buy_prices[i]),
+            sell_exchange=exchanges[sell_idx[i]],
+            sell_price=float(sell_prices[i]),
+            profit_margin=profit_margin,
+            estimated_profit_percent=profit_margin * 100
+        )
+    return opportunities
+
 def analyze_market_depth(orderbook, trade_size):
     """
     Analyzes the market depth to determine the effective price for a given trade size
@@ -57,27 +183,20 @@ def analyze_market_depth(orderbook, trade_size):
     """
     # Implementation would depend on the structure of your orderbook data
     # This is a simplified version
-    remaining = trade_size
-    total_cost = 0
+    sells = orderbook['sells']
+    prices = np.fromiter((float(order['price']) for order in sells), dtype=np.float64, count=len(sells))
+    quantities = np.fromiter((float(order['quantity']) for order in sells), dtype=np.float64, count=len(sells))
     
-    for order in orderbook['sells']:
-        price = float(order['price'])
-        quantity = float(order['quantity'])
-        
-        if remaining <= quantity:
-            total_cost += price * remaining
-            remaining = 0
-            break
-        else:
-            total_cost += price * quantity
-            remaining -= quantity
-    
-    if remaining > 0:
+    effective_price = _depth_nb(prices, quantities, float(trade_size))
+    
+    if np.isnan(effective_price):
         return None  # Not enough liquidity
         
-    return total_cost / trade_size  # Effective price
+    return float(effective_price)
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    
     # Test with sample data
     prices = {
         "injective": 25.75,
@@ -88,8 +207,8 @@ if __name__ == "__main__":
     opportunity = detect_arbitrage_opportunity(prices)
     if opportunity:
         print(f"Arbitrage opportunity found!")
-        print(f"Buy on {opportunity['buy_exchange']} at ${opportunity['buy_price']}")
-        print(f"Sell on {opportunity['sell_exchange']} at ${opportunity['sell_price']}")
-        print(f"Estimated profit: {opportunity['estimated_profit_percent']:.2f}%")
+        print(f"Buy on {opportunity.buy_exchange} at ${opportunity.buy_price}")
+        print(f"Sell on {opportunity.sell_exchange} at ${opportunity.sell_price}")
+        print(f"Estimated profit: {opportunity.estimated_profit_percent:.2f}%")
     else:
         print("No profitable arbitrage opportunity found")
\ No newline at end of file
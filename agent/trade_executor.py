@@ -1,27 +1,44 @@
-import time
+import asyncio
 import logging
+import numpy as np
 
-# Setup logging
-logging.basicConfig(level=logging.INFO, 
-                    format='%(asctime)s - %(levelname)s - %(message)s',
-                    handlers=[
-                        logging.FileHandler("logs/trades.log"),
-                        logging.StreamHandler()
-                    ])
+# Handlers are configured by the entry point (main.py / app.py), not on import
+logger = logging.getLogger(__name__)
+
+def compute_profits(buy_prices, sell_prices, amounts, fee=0.001):
+    """
+    Compute net profits for a batch of arbitrage trades at once, e.g. when backtesting
+    
+    Uses the same fee model as TradeExecutor.execute_arbitrage, which keeps its
+    scalar calculation for live trades.
+    
+    Args:
+        buy_prices: Array of buy prices
+        sell_prices: Array of sell prices
+        amounts: Array of trade amounts in base currency
+        fee: Fee rate charged on each leg
+        
+    Returns:
+        Array of net profits
+    """
+    buy_prices = np.asarray(buy_prices, dtype=np.float64)
+    sell_prices = np.asarray(sell_prices, dtype=np.float64)
+    amounts = np.asarray(amounts, dtype=np.float64)
+    return amounts * (sell_prices - buy_prices) - amounts * buy_prices * fee * 2
 
 class TradeExecutor:
     def __init__(self, wallet_address, private_key, network="mainnet"):
         self.wallet_address = wallet_address
         self.private_key = private_key
         self.network = network
-        logging.info(f"Initialized TradeExecutor for wallet {wallet_address[:8]}... on {network}")
+        logger.info("Initialized TradeExecutor for wallet %s... on %s", wallet_address[:8], network)
         
-    def execute_arbitrage(self, opportunity, amount):
+    async def execute_arbitrage(self, opportunity, amount):
         """
         Execute an arbitrage trade based on the detected opportunity
         
         Args:
-            opportunity: Dictionary with buy/sell exchange details
+            opportunity: Opportunity with buy/sell exchange details
             amount: Amount to trade in base currency
             
         Returns:
@@ -29,82 +46,83 @@ class TradeExecutor:
             profit: Actual profit made (or None if trade failed)
         """
         if not opportunity:
-            logging.warning("No valid opportunity provided")
+            logger.warning("No valid opportunity provided")
             return False, None
             
         # Log the opportunity
-        logging.info(f"Executing arbitrage: Buy on {opportunity['buy_exchange']} at {opportunity['buy_price']}, " +
-                    f"Sell on {opportunity['sell_exchange']} at {opportunity['sell_price']}")
+        logger.info("Executing arbitrage: Buy on %s at %s, Sell on %s at %s",
+                    opportunity.buy_exchange, opportunity.buy_price,
+                    opportunity.sell_exchange, opportunity.sell_price)
         
         # Step 1: Buy on the cheaper exchange
-        buy_success = self._execute_buy(
-            exchange=opportunity['buy_exchange'],
-            price=opportunity['buy_price'],
+        buy_success = await self._execute_buy(
+            exchange=opportunity.buy_exchange,
+            price=opportunity.buy_price,
             amount=amount
         )
         
         if not buy_success:
-            logging.error("Buy order failed, aborting arbitrage")
+            logger.error("Buy order failed, aborting arbitrage")
             return False, None
             
         # Step 2: Sell on the more expensive exchange
-        sell_success = self._execute_sell(
-            exchange=opportunity['sell_exchange'],
-            price=opportunity['sell_price'],
+        sell_success = await self._execute_sell(
+            exchange=opportunity.sell_exchange,
+            price=opportunity.sell_price,
             amount=amount
         )
         
         if not sell_success:
-            logging.error("Sell order failed after buy was executed")
+            logger.error("Sell order failed after buy was executed")
             # Here you might want to implement emergency sell on the original exchange
             return False, None
             
         # Calculate actual profit
-        fees = amount * opportunity['buy_price'] * 0.001 * 2  # 0.1% fee on both transactions
-        gross_profit = amount * (opportunity['sell_price'] - opportunity['buy_price'])
+        fees = amount * opportunity.buy_price * 0.001 * 2  # 0.1% fee on both transactions
+        gross_profit = amount * (opportunity.sell_price - opportunity.buy_price)
         net_profit = gross_profit - fees
         
-        logging.info(f"Arbitrage completed successfully. Net profit: ${net_profit:.2f}")
+        logger.info("Arbitrage completed successfully. Net profit: $%.2f", net_profit)
         return True, net_profit
             
-    def _execute_buy(self, exchange, price, amount):
+    async def _execute_buy(self, exchange, price, amount):
         """Execute a buy order on the specified exchange"""
-        logging.info(f"Executing BUY order on {exchange} for {amount} at price ${price}")
+        logger.info("Executing BUY order on %s for %s at price $%s", exchange, amount, price)
         
         # In a real implementation, this would connect to the exchange API
         # For now, we'll simulate a successful trade
-        time.sleep(1)  # Simulate network delay
+        await asyncio.sleep(1)  # Simulate network delay without blocking the event loop
         
         # Add exchange-specific implementation here
         if exchange == "injective":
             # Injective-specific order execution
-            return self._execute_injective_order("buy", price, amount)
+            return await self._execute_injective_order("buy", price, amount)
         else:
             # Simulate other exchanges
-            logging.warning(f"Exchange {exchange} not directly supported, simulating order")
+            logger.warning("Exchange %s not directly supported, simulating order", exchange)
             return True
             
-    def _execute_sell(self, exchange, price, amount):
+    async def _execute_sell(self, exchange, price, amount):
         """Execute a sell order on the specified exchange"""
-        logging.info(f"Executing SELL order on {exchange} for {amount} at price ${price}")
+        logger.info("Executing SELL order on %s for %s at price $%s", exchange, amount, price)
         
         # Similar to buy, with exchange-specific implementation
-        time.sleep(1)  # Simulate network delay
+        await asyncio.sleep(1)  # Simulate network delay without blocking the event loop
         
         if exchange == "injective":
-            return self._execute_injective_order("sell", price, amount)
+            return await self._execute_injective_order("sell", price, amount)
         else:
-            logging.warning(f"Exchange {exchange} not directly supported, simulating order")
+            logger.warning("Exchange %s not directly supported, simulating order", exchange)
             return True
             
-    def _execute_injective_order(self, side, price, amount):
+    async def _execute_injective_order(self, side, price, amount):
         """
         Execute an order on Injective
         
         This is where you'd integrate with the Injective Chain SDK
         """
         # In a real implementation, this would use the Injective SDK
-        logging.info(f"Sending {side.upper()} order to Injective Chain: {amount} @ ${price}")
+        logger.info("Sending %s order to Injective Chain: %s @ $%s", side.upper(), amount, price)
         
         # Placeholder for actual SDK integration
         # from pyinjective.composer import Composer
@@ -114,6 +132,8 @@ class TradeExecutor:
         return True  # Placeholder success response
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    
     # Test the executor
     executor = TradeExecutor(
         wallet_address="inj1your-wallet-address", 
@@ -121,14 +141,16 @@ if __name__ == "__main__":
         network="testnet"  # Use testnet for testing
     )
     
-    test_opportunity = {
-        "buy_exchange": "binance",
-        "buy_price": 25.65,
-        "sell_exchange": "kucoin",
-        "sell_price": 25.85,
-        "profit_margin": 0.007,
-        "estimated_profit_percent": 0.7
-    }
+    from agent.strategy import Opportunity
+    
+    test_opportunity = Opportunity(
+        buy_exchange="binance",
+        buy_price=25.65,
+        sell_exchange="kucoin",
+        sell_price=25.85,
+        profit_margin=0.007,
+        estimated_profit_percent=0.7
+    )
     
-    success, profit = executor.execute_arbitrage(test_opportunity, amount=1.0)
+    success, profit = asyncio.run(executor.execute_arbitrage(test_opportunity, amount=1.0))
     print(f"Trade execution successful: {success}, Profit: ${profit:.2f}" if profit else "Trade failed")
\ No newline at end of file
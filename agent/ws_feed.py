@@ -0,0 +1,112 @@
+import asyncio
+import logging
+import orjson
+import time
+
+from agent.data_fetcher import PRICE_STALE_TTL, PriceSnapshot, fetch_all_prices_async
+
+# websockets is optional; without it every exchange is polled over REST
+try:
+    import websockets
+    WEBSOCKETS_AVAILABLE = True
+except ImportError:
+    logging.warning("websockets not available. Streaming prices will fall back to REST polling.")
+    WEBSOCKETS_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# Binance combined stream; one miniTicker stream per pair is pushed about once per second
+BINANCE_STREAM_URL = "wss://stream.binance.com:9443/stream?streams="
+
+# Exchanges whose prices arrive over a websocket instead of REST
+STREAMED_EXCHANGES = ("binance",)
+
+# A streamed price with no push for this many seconds is dropped
+STREAM_QUOTE_TTL = PRICE_STALE_TTL
+
+async def subscribe(token_pairs, on_tick, rest_interval=10, session=None):
+    """
+    Stream prices for token_pairs, calling on_tick(token_pair, prices) on every update
+
+    Binance prices are pushed over its websocket stream. Exchanges without a
+    websocket endpoint are polled over REST every rest_interval seconds, and
+    Binance joins the polling whenever its stream is down. prices is a new
+    PriceSnapshot on every call, holding only quotes that have not expired; its
+    stale set names exchanges that a poll served from the last-good cache.
+
+    Runs until cancelled.
+    """
+    # token pair -> exchange -> (price, expires_at on the monotonic clock, stale)
+    quotes = {token_pair: {} for token_pair in token_pairs}
+    streaming = asyncio.Event()
+
+    def publish(token_pair):
+        """Drop expired quotes for token_pair and pass a snapshot of the rest to on_tick"""
+        now = time.monotonic()
+        pair_quotes = quotes[token_pair]
+        prices = PriceSnapshot()
+        for exchange, (price, expires_at, stale) in list(pair_quotes.items()):
+            if expires_at <= now:
+                del pair_quotes[exchange]
+                continue
+            prices[exchange] = price
+            if stale:
+                prices.stale.add(exchange)
+        on_tick(token_pair, prices)
+
+    poller = asyncio.create_task(_poll_rest(token_pairs, quotes, publish, rest_interval, streaming, session))
+    try:
+        if WEBSOCKETS_AVAILABLE:
+            await _stream_binance(token_pairs, quotes, publish, streaming)
+        else:
+            await poller
+    finally:
+        poller.cancel()
+        await asyncio.gather(poller, return_exceptions=True)
+
+async def _stream_binance(token_pairs, quotes, publish, streaming):
+    """Apply Binance miniTicker pushes to quotes, reconnecting with backoff"""
+    by_symbol = {token_pair.replace('/', ''): token_pair for token_pair in token_pairs}
+    url = BINANCE_STREAM_URL + "/".join(f"{symbol.lower()}@miniTicker" for symbol in by_symbol)
+    delay = 1
+
+    while True:
+        try:
+            async with websockets.connect(url, ping_interval=20) as ws:
+                logger.info(f"Connected to Binance price stream for {len(by_symbol)} pairs")
+                streaming.set()
+                delay = 1
+                async for message in ws:
+                    ticker = orjson.loads(message).get('data') or {}
+                    token_pair = by_symbol.get(ticker.get('s'))
+                    if token_pair is None:
+                        continue
+                    quotes[token_pair]['binance'] = (float(ticker['c']), time.monotonic() + STREAM_QUOTE_TTL, False)
+                    publish(token_pair)
+        except (OSError, asyncio.TimeoutError, websockets.WebSocketException, ValueError, KeyError) as e:
+            logger.warning(f"Binance price stream unavailable ({e}); reconnecting in {delay}s")
+        # The poller takes Binance over until the stream is back
+        streaming.clear()
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, 60)
+
+async def _poll_rest(token_pairs, quotes, publish, rest_interval, streaming, session):
+    """Refresh quotes over REST for exchanges that are not currently streaming"""
+    while True:
+        skip = STREAMED_EXCHANGES if streaming.is_set() else ()
+        prices_by_pair = await fetch_all_prices_async(token_pairs, session, skip)
+        # A polled quote lives until the next poll has had time to replace it
+        expires_at = time.monotonic() + rest_interval + PRICE_STALE_TTL
+
+        for token_pair, fetched in prices_by_pair.items():
+            fetched = fetched or {}
+            stale = getattr(fetched, 'stale', ())
+            pair_quotes = quotes[token_pair]
+            # Exchanges this poll covered but did not return a price for are dropped
+            for exchange in [exchange for exchange in pair_quotes if exchange not in skip and exchange not in fetched]:
+                del pair_quotes[exchange]
+            for exchange, price in fetched.items():
+                pair_quotes[exchange] = (price, expires_at, exchange in stale)
+            publish(token_pair)
+
+        await asyncio.sleep(rest_interval)
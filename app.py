@@ -1,25 +1,31 @@
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect, Depends, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+import aiohttp
 import asyncio
+import hmac
 import logging
-import json
+import orjson
 import os
-from typing import List, Dict, Any, Optional
+from collections import deque
+from typing import Deque, Dict, Any, Optional, Set
 from datetime import datetime
 from pydantic import BaseModel
 
 # Import agent modules
-from agent.data_fetcher import fetch_prices_across_exchanges
+from agent.data_fetcher import fetch_all_prices_async
 from agent.strategy import detect_arbitrage_opportunity
 from agent.risk_management import RiskManager
+from agent.logging_config import configure_logging
 
 # Setup logging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+configure_logging()
 logger = logging.getLogger(__name__)
 
 # Initialize FastAPI app
-app = FastAPI(title="DeFi Arbitrage Bot API")
+# Responses are serialized with orjson, which also handles datetimes natively
+app = FastAPI(title="DeFi Arbitrage Bot API", default_response_class=ORJSONResponse)
 
 # Add CORS middleware
 app.add_middleware(
@@ -32,11 +38,11 @@ app.add_middleware(
 
 # Security
 security = HTTPBearer()
+_API_TOKEN = os.getenv("API_TOKEN", "default_token").encode()
 
 def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security)):
-    """Simple token verification"""
-    correct_token = os.getenv("API_TOKEN", "default_token")
-    if credentials.credentials != correct_token:
+    """Simple token verification, compared in constant time"""
+    if not hmac.compare_digest(credentials.credentials.encode(), _API_TOKEN):
         raise HTTPException(status_code=401, detail="Invalid token")
     return credentials.credentials
 
@@ -61,28 +67,70 @@ class TradeExecution(BaseModel):
 # WebSocket connection manager
 class ConnectionManager:
     def __init__(self):
-        self.active_connections: List[WebSocket] = []
+        self.active_connections: Set[WebSocket] = set()
         
     async def connect(self, websocket: WebSocket):
         await websocket.accept()
-        self.active_connections.append(websocket)
+        # Each client gets a bounded outbox drained by its own writer task, so a
+        # slow client never applies backpressure to the monitor loop
+        websocket.state.outbox = asyncio.Queue(maxsize=64)
+        websocket.state.writer = asyncio.create_task(self._drain(websocket))
+        self.active_connections.add(websocket)
         logger.info(f"New WebSocket connection. Total connections: {len(self.active_connections)}")
         
     def disconnect(self, websocket: WebSocket):
-        self.active_connections.remove(websocket)
-        logger.info(f"WebSocket disconnected. Remaining connections: {len(self.active_connections)}")
+        # A failed send may already have dropped this connection
+        if websocket in self.active_connections:
+            self.active_connections.discard(websocket)
+            logger.info(f"WebSocket disconnected. Remaining connections: {len(self.active_connections)}")
+        writer = getattr(websocket.state, "writer", None)
+        if writer is not None and writer is not asyncio.current_task():
+            writer.cancel()
         
-    async def broadcast(self, message: dict):
-        for connection in self.active_connections:
-            await connection.send_json(message)
+    async def _drain(self, websocket: WebSocket):
+        outbox = websocket.state.outbox
+        try:
+            while True:
+                text = await outbox.get()
+                await asyncio.wait_for(websocket.send_text(text), timeout=5.0)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"Dropping WebSocket after failed send: {e!r}")
+            self.disconnect(websocket)
+        
+    def broadcast_text(self, text: str):
+        # Queue one pre-serialized message for every client. Sent as a text frame,
+        # since the dashboard parses event.data as a string.
+        # Iterate a snapshot, since a writer task may drop its connection meanwhile
+        for websocket in list(self.active_connections):
+            self.send(websocket, text)
+            
+    def send(self, websocket: WebSocket, text: str):
+        # All writes go through the outbox so only the writer task touches the socket
+        outbox = websocket.state.outbox
+        if outbox.full():
+            # Only the latest snapshot matters, so drop the oldest queued message
+            outbox.get_nowait()
+        outbox.put_nowait(text)
 
 # Initialize connection manager
 manager = ConnectionManager()
 
-# Store recent opportunities and trades
-recent_opportunities: List[ArbitrageOpportunity] = []
-recent_trades: List[TradeExecution] = []
-market_data: Dict[str, Any] = {}
+# Store recent opportunities and trades; the oldest entries are evicted automatically
+recent_opportunities: Deque[ArbitrageOpportunity] = deque(maxlen=20)
+recent_trades: Deque[TradeExecution] = deque(maxlen=20)
+
+# Pairs watched by the monitor. Their market_data entries are allocated once and
+# updated in place every tick.
+TOKEN_PAIRS = ["INJ/USDT", "ETH/USDT", "BTC/USDT"]
+market_data: Dict[str, Any] = {
+    token_pair: {"prices": None, "updated_at": None} for token_pair in TOKEN_PAIRS
+}
+
+# Seconds a client may stay silent before the server pings it
+HEARTBEAT_INTERVAL = 30
+PING_MESSAGE = orjson.dumps({"type": "ping"}).decode()
 
 # WebSocket endpoint for real-time updates
 @app.websocket("/ws")
@@ -90,34 +138,42 @@ async def websocket_endpoint(websocket: WebSocket):
     await manager.connect(websocket)
     try:
         while True:
-            # Keep connection alive
-            await websocket.receive_text()
+            try:
+                await asyncio.wait_for(websocket.receive_text(), timeout=HEARTBEAT_INTERVAL)
+            except asyncio.TimeoutError:
+                # Idle client: ping it so a dead peer fails the next send and is dropped
+                manager.send(websocket, PING_MESSAGE)
     except WebSocketDisconnect:
         manager.disconnect(websocket)
 
 # Arbitrage monitoring task
-async def monitor_arbitrage():
+async def monitor_arbitrage(session: aiohttp.ClientSession):
     """Background task to monitor arbitrage opportunities"""
-    token_pairs = ["INJ/USDT", "ETH/USDT", "BTC/USDT"]
+    token_pairs = TOKEN_PAIRS
     risk_manager = RiskManager(max_trade_amount=1.0, max_daily_loss=0.5, max_trade_count=10)
     
     while True:
-        for token_pair in token_pairs:
+        # Fetch prices for all pairs concurrently
+        prices_by_pair = await fetch_all_prices_async(token_pairs, session)
+        
+        # One timestamp for the whole tick
+        now = datetime.now()
+        now_iso = now.isoformat()
+        
+        for token_pair, prices in prices_by_pair.items():
             try:
-                # Fetch prices
-                prices = fetch_prices_across_exchanges(token_pair)
                 if prices:
                     # Update market data
-                    market_data[token_pair] = {
-                        "prices": prices,
-                        "updated_at": datetime.now().isoformat()
-                    }
+                    entry = market_data[token_pair]
+                    entry["prices"] = prices
+                    entry["updated_at"] = now_iso
                     
-                    # Broadcast market data update
-                    await manager.broadcast({
+                    # Broadcast only this pair's entry, serialized once for all clients
+                    manager.broadcast_text(orjson.dumps({
                         "type": "market_update",
-                        "data": market_data
-                    })
+                        "pair": token_pair,
+                        "data": entry
+                    }).decode())
                     
                     # Detect arbitrage opportunities
                     opportunity = detect_arbitrage_opportunity(
@@ -129,24 +185,23 @@ async def monitor_arbitrage():
                         # Create opportunity object
                         opp = ArbitrageOpportunity(
                             token_pair=token_pair,
-                            buy_exchange=opportunity["buy_exchange"],
-                            buy_price=opportunity["buy_price"],
-                            sell_exchange=opportunity["sell_exchange"],
-                            sell_price=opportunity["sell_price"],
-                            profit_margin=opportunity["profit_margin"],
-                            estimated_profit_percent=opportunity["estimated_profit_percent"],
-                            timestamp=datetime.now()
+                            buy_exchange=opportunity.buy_exchange,
+                            buy_price=opportunity.buy_price,
+                            sell_exchange=opportunity.sell_exchange,
+                            sell_price=opportunity.sell_price,
+                            profit_margin=opportunity.profit_margin,
+                            estimated_profit_percent=opportunity.estimated_profit_percent,
+                            timestamp=now
                         )
                         
                         # Store and broadcast opportunity
                         recent_opportunities.append(opp)
-                        if len(recent_opportunities) > 20:
-                            recent_opportunities.pop(0)
                             
-                        await manager.broadcast({
-                            "type": "arbitrage_opportunity",
-                            "data": json.loads(opp.json())
-                        })
+                        # Splice pydantic's JSON straight into the envelope instead of
+                        # dumping to a dict and serializing it again
+                        manager.broadcast_text(
+                            '{"type":"arbitrage_opportunity","data":' + opp.model_dump_json() + '}'
+                        )
                         
                         # Here we would integrate with trade executor
                         # For now, we're just logging the opportunity
@@ -165,11 +220,11 @@ def read_root():
 
 @app.get("/opportunities", dependencies=[Depends(verify_token)])
 def get_opportunities():
-    return recent_opportunities
+    return list(recent_opportunities)
 
 @app.get("/trades", dependencies=[Depends(verify_token)])
 def get_trades():
-    return recent_trades
+    return list(recent_trades)
 
 @app.get("/market-data", dependencies=[Depends(verify_token)])
 def get_market_data():
@@ -184,8 +239,19 @@ def update_config(config: dict):
 # Start background task when app starts
 @app.on_event("startup")
 async def startup_event():
-    asyncio.create_task(monitor_arbitrage())
+    # One keep-alive HTTP session for the app's lifetime, shared by every price fetch
+    app.state.http = aiohttp.ClientSession(
+        connector=aiohttp.TCPConnector(limit=100, ttl_dns_cache=300, keepalive_timeout=75)
+    )
+    app.state.monitor = asyncio.create_task(monitor_arbitrage(app.state.http))
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    app.state.monitor.cancel()
+    await asyncio.gather(app.state.monitor, return_exceptions=True)
+    await app.state.http.close()
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run("app:app", host="0.0.0.0", port=8000, reload=True)
\ No newline at end of file
+    uvicorn.run("app:app", host="0.0.0.0", port=8000, reload=True,
+                loop="uvloop", http="httptools", ws="websockets")
\ No newline at end of file
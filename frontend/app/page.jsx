@@ -47,10 +47,11 @@ export default function Dashboard() {
         const data = JSON.parse(event.data);
 
         if (data.type === "market_update") {
-          setMarketData(data.data);
+          // Updates carry a single pair; merge it into the existing snapshot
+          setMarketData((prev) => ({ ...prev, [data.pair]: data.data }));
 
-          if (data.data[selectedPair]) {
-            const prices = data.data[selectedPair].prices;
+          if (data.pair === selectedPair) {
+            const prices = data.data.prices;
             const timestamp = new Date().toLocaleTimeString();
 
             setPriceHistory((prev) => {
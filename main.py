@@ -1,27 +1,40 @@
+import asyncio
+import functools
+import importlib.util
 import time
 import logging
 import os
+import signal
 import yaml
 import sys
 
-# Setup logging
-os.makedirs("logs", exist_ok=True)
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler("logs/bot.log"),
-        logging.StreamHandler()
-    ]
-)
+# Prefer the libyaml C loader, falling back to the pure-Python one
+try:
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:
+    from yaml import SafeLoader
 
 # Make sure the agent module can be found
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+# Runtime directories, created once at startup rather than checked on every use
+RUNTIME_DIRS = ("logs", "config", ".cache")
+
+def _ensure_dirs():
+    for directory in RUNTIME_DIRS:
+        os.makedirs(directory, exist_ok=True)
+
+_ensure_dirs()
+
+# Setup logging
+from agent.logging_config import configure_logging
+configure_logging(log_file="bot.log")
+
 # Import the agent modules
 try:
-    from agent.data_fetcher import fetch_prices_across_exchanges
-    from agent.strategy import detect_arbitrage_opportunity
+    from agent.data_fetcher import fetch_prices_across_exchanges_async, fetch_available_tickers_async, close_session
+    from agent.strategy import detect_arbitrage_opportunity, detect_arbitrage_opportunities
+    from agent.ws_feed import subscribe
 except ImportError as e:
     logging.error(f"Error importing agent modules: {e}")
     sys.exit(1)
@@ -44,13 +57,19 @@ class SimpleRiskManager:
     def record_trade_result(self, success, profit):
         logging.info(f"Trade recorded: success={success}, profit=${profit:.2f}")
 
-# Try to import the proper RiskManager
-try:
+# Use the proper RiskManager if its module is present
+if importlib.util.find_spec("agent.risk_management"):
     from agent.risk_management import RiskManager
-except ImportError:
+else:
     logging.warning("Could not import RiskManager from agent.risk_management. Using SimpleRiskManager instead.")
     RiskManager = SimpleRiskManager
 
+# 0.1% simulated fee on each leg, charged on that leg's own price and folded into
+# per-unit price multipliers. Batch form: amounts * (sell_prices * SELL_MULT - buy_prices * BUY_MULT).
+# TradeExecutor charges both fees on the buy notional instead (see compute_profits).
+BUY_MULT = 1.001
+SELL_MULT = 0.999
+
 class SimpleTradeExecutor:
     """A simple trade executor to use for testing"""
     
@@ -60,65 +79,212 @@ class SimpleTradeExecutor:
         self.network = network
         logging.info(f"Initialized SimpleTradeExecutor (SIMULATION MODE)")
     
-    def execute_arbitrage(self, opportunity, amount):
+    async def execute_arbitrage(self, opportunity, amount):
         if not opportunity:
             return False, None
         
         logging.info(f"[SIMULATION] Executing arbitrage:")
-        logging.info(f"[SIMULATION] Buy {amount} on {opportunity['buy_exchange']} at ${opportunity['buy_price']}")
-        logging.info(f"[SIMULATION] Sell {amount} on {opportunity['sell_exchange']} at ${opportunity['sell_price']}")
+        logging.info(f"[SIMULATION] Buy {amount} on {opportunity.buy_exchange} at ${opportunity.buy_price}")
+        logging.info(f"[SIMULATION] Sell {amount} on {opportunity.sell_exchange} at ${opportunity.sell_price}")
         
         # Calculate simulated profit
-        buy_cost = amount * opportunity['buy_price']
-        sell_revenue = amount * opportunity['sell_price']
-        fees = buy_cost * 0.001 + sell_revenue * 0.001  # 0.1% fee each way
-        profit = sell_revenue - buy_cost - fees
+        profit = amount * (opportunity.sell_price * SELL_MULT - opportunity.buy_price * BUY_MULT)
         
         logging.info(f"[SIMULATION] Trade successful. Profit: ${profit:.2f}")
         return True, profit
 
-# Try to import the proper TradeExecutor
-try:
+# Use the proper TradeExecutor if its module is present
+if importlib.util.find_spec("agent.trade_executor"):
     from agent.trade_executor import TradeExecutor
-except ImportError:
+else:
     logging.warning("Could not import TradeExecutor from agent.trade_executor. Using SimpleTradeExecutor instead.")
     TradeExecutor = SimpleTradeExecutor
 
+@functools.lru_cache(maxsize=4)
+def _load_yaml(path, mtime):
+    """Parse a YAML file; cached per (path, mtime) so an unchanged file is only parsed once"""
+    with open(path, 'r') as file:
+        return yaml.load(file, Loader=SafeLoader)
+
+def _cached_yaml(path):
+    """Return the parsed YAML file, re-reading it only when its mtime changes"""
+    return _load_yaml(path, os.path.getmtime(path))
+
+def _write_default_agent_config(config_file):
+    """Create the default agent configuration file"""
+    default_config = {
+        "agent10": {
+            "address": "inj1default",
+            "created_at": "2024-03-02",
+            "private_key": "defaultkey",
+            "network": "testnet"
+        }
+    }
+    
+    with open(config_file, 'w') as f:
+        yaml.dump(default_config, f)
+    
+    logging.info(f"Created default configuration file: {config_file}")
+
 def load_agent_config(agent_name):
     """Load agent configuration from YAML file"""
     config_file = 'config/agents_config.yaml'
     
-    # Create default config if it doesn't exist
-    if not os.path.exists(config_file):
-        os.makedirs(os.path.dirname(config_file), exist_ok=True)
+    try:
+        # Create default config if it doesn't exist; the mtime lookup doubles as the existence check
+        try:
+            config = _cached_yaml(config_file)
+        except FileNotFoundError:
+            _write_default_agent_config(config_file)
+            config = _cached_yaml(config_file)
         
-        default_config = {
-            "agent10": {
-                "address": "inj1default",
-                "created_at": "2024-03-02",
-                "private_key": "defaultkey",
-                "network": "testnet"
-            }
-        }
+        if agent_name in config:
+            return config[agent_name]
+        else:
+            logging.error(f"Agent {agent_name} not found in configuration")
+            return None
+    except Exception as e:
+        logging.error(f"Error loading agent configuration: {e}")
+        return None
+
+# Seconds between periodic stats lines
+STATS_INTERVAL = 600
+
+# Seconds stream mode waits before asking the risk manager again once limits are reached
+LIMIT_RECHECK_INTERVAL = 60
+
+def _log_stats(stats, started_at):
+    """Log activity counters since the bot started"""
+    uptime_minutes = (time.monotonic() - started_at) / 60
+    logging.info("Stats after %.0f min: %d checks, %d opportunities, %d trades executed",
+                 uptime_minutes, stats['checks'], stats['opportunities'], stats['trades'])
+
+def _make_cycle(token_pairs, fetch_pair, execute_opportunity, risk_manager, stats):
+    """
+    Build the polling tick for a fixed set of token pairs
+    
+    The pairs don't change during a run, so they are frozen into a tuple and the
+    callables used on every tick are bound to closure variables once, replacing
+    repeated global and attribute lookups in the loop.
+    
+    Ticks are pipelined: a tick starts its trades in the background and returns,
+    and the next tick starts fetching before it waits for them to settle. At most
+    one batch of trades is in flight at a time.
+    
+    Returns:
+        (process_tick, settle) coroutine functions; await settle() on shutdown
+        to let the last batch of trades finish. Cancelling a waiter never cancels
+        the trades themselves, so an arbitrage is not cut off between its legs.
+    """
+    pairs = tuple(token_pairs)
+    gather = asyncio.gather
+    detect_all = detect_arbitrage_opportunities
+    can_trade = risk_manager.can_execute_trade
+    min_profit_threshold = risk_manager.get_min_profit_threshold
+    log_debug = logging.debug
+    pending_trades = None
+    
+    async def settle():
+        """Wait for the trades started by the previous tick"""
+        nonlocal pending_trades
+        if pending_trades is not None:
+            await asyncio.shield(pending_trades)
+            pending_trades = None
+    
+    async def process_tick():
+        """Fetch all pairs, detect opportunities across them at once and trade on them"""
+        # Check if we've reached our trading limits
+        if not can_trade():
+            logging.warning("Trading limits reached. Waiting for reset.")
+            return
+        
+        nonlocal pending_trades
         
-        with open(config_file, 'w') as f:
-            yaml.dump(default_config, f)
+        # 1. Fetch prices across exchanges for every pair concurrently, overlapping
+        # with the settlement of the previous tick's trades
+        fetches = gather(*[fetch_pair(token_pair) for token_pair in pairs], return_exceptions=True)
+        try:
+            await settle()
+        except BaseException:
+            # Shutting down: don't leave this tick's fetches running unawaited
+            fetches.cancel()
+            await gather(fetches, return_exceptions=True)
+            raise
+        results = await fetches
+        
+        prices_by_pair = {}
+        for token_pair, prices in zip(pairs, results):
+            if isinstance(prices, Exception):
+                logging.error("Error processing %s: %s", token_pair, prices)
+            elif not prices:
+                logging.warning("Could not fetch prices for %s", token_pair)
+            else:
+                prices_by_pair[token_pair] = prices
         
-        logging.info(f"Created default configuration file: {config_file}")
+        # 2. Detect arbitrage opportunities for all pairs in one vectorized pass.
+        # The threshold follows daily P/L, so it is read on every tick.
+        stats['checks'] += len(prices_by_pair)
+        opportunities = detect_all(prices_by_pair, min_profit_threshold=min_profit_threshold())
+        
+        for token_pair in prices_by_pair:
+            if token_pair not in opportunities:
+                log_debug("No arbitrage opportunity found for %s", token_pair)
+        
+        # 3. Execute trades for the pairs with an opportunity; the next tick waits for them
+        if opportunities:
+            pending_trades = gather(*[
+                execute_opportunity(token_pair, opportunity)
+                for token_pair, opportunity in opportunities.items()
+            ])
+    
+    return process_tick, settle
+
+async def _run_streaming(token_pairs, risk_manager, evaluate_prices, stats):
+    """Evaluate every pushed price update instead of polling on a timer"""
+    # A pair only gets a new evaluation once the previous one (and its trade) has finished
+    in_flight = {}
+    # Once the limits are hit, pushes are ignored until the next recheck instead of
+    # asking the risk manager (and logging its warning) on every tick
+    paused_until = 0.0
     
+    def on_tick(token_pair, prices):
+        nonlocal paused_until
+        if token_pair in in_flight:
+            return
+        now = time.monotonic()
+        if now < paused_until:
+            return
+        if not risk_manager.can_execute_trade():
+            paused_until = now + LIMIT_RECHECK_INTERVAL
+            return
+        # prices is a fresh snapshot per tick, so it is safe to hand to the task
+        task = asyncio.create_task(evaluate_prices(token_pair, prices))
+        in_flight[token_pair] = task
+        task.add_done_callback(lambda _: in_flight.pop(token_pair, None))
+    
+    async def report_stats():
+        """Log the stats line on the same monotonic cadence as polling mode"""
+        started_at = time.monotonic()
+        next_stats_at = started_at + STATS_INTERVAL
+        while True:
+            await asyncio.sleep(next_stats_at - time.monotonic())
+            _log_stats(stats, started_at)
+            next_stats_at += STATS_INTERVAL
+    
+    reporter = asyncio.create_task(report_stats())
     try:
-        with open(config_file, 'r') as file:
-            config = yaml.safe_load(file)
-            if agent_name in config:
-                return config[agent_name]
-            else:
-                logging.error(f"Agent {agent_name} not found in configuration")
-                return None
+        await subscribe(token_pairs, on_tick)
     except Exception as e:
-        logging.error(f"Error loading agent configuration: {e}")
-        return None
+        logging.error("Unexpected error: %s", e)
+    finally:
+        reporter.cancel()
+        try:
+            # Shielded so a shutdown lets trades that already started finish both legs
+            await asyncio.shield(asyncio.gather(*in_flight.values(), return_exceptions=True))
+        finally:
+            await close_session()
 
-def run_arbitrage_bot(agent_name, token_pairs, interval=60, max_trade_amount=1.0):
+async def run_arbitrage_bot(agent_name, token_pairs, interval=60, max_trade_amount=1.0, workers=8, stream=False):
     """
     Run the arbitrage bot for the specified agent and token pairs
     
@@ -127,6 +293,8 @@ def run_arbitrage_bot(agent_name, token_pairs, interval=60, max_trade_amount=1.0
         token_pairs: List of token pairs to monitor (e.g., ["INJ/USDT", "BTC/USDT"])
         interval: Time between checks in seconds
         max_trade_amount: Maximum amount to trade in a single arbitrage
+        workers: Maximum number of token pairs fetched at the same time
+        stream: React to streamed price updates instead of polling every interval
     """
     # Load agent configuration
     agent_config = load_agent_config(agent_name)
@@ -152,73 +320,134 @@ def run_arbitrage_bot(agent_name, token_pairs, interval=60, max_trade_amount=1.0
         max_trade_count=10
     )
     
-    logging.info(f"Starting arbitrage bot for agent {agent_name}")
-    logging.info(f"Monitoring token pairs: {', '.join(token_pairs)}")
+    stats = {'checks': 0, 'opportunities': 0, 'trades': 0}
+    
+    # Caps how many pairs hit the exchanges at once when many pairs are monitored
+    semaphore = asyncio.Semaphore(workers)
+    
+    # Risk limits are only updated once a trade returns, so checking them, trading and
+    # recording the result happen under one lock; otherwise every concurrent pair would
+    # pass the check before any of them is counted
+    trade_lock = asyncio.Lock()
+    
+    async def fetch_pair(token_pair):
+        """Fetch prices for one token pair while holding a worker slot"""
+        async with semaphore:
+            return await fetch_prices_across_exchanges_async(token_pair)
+    
+    async def evaluate_prices(token_pair, prices):
+        """Detect and trade an arbitrage opportunity in one price snapshot"""
+        stats['checks'] += 1
+        opportunity = detect_arbitrage_opportunity(
+            prices, 
+            min_profit_threshold=risk_manager.get_min_profit_threshold()
+        )
+        
+        if opportunity:
+            await execute_opportunity(token_pair, opportunity)
+        else:
+            logging.debug("No arbitrage opportunity found for %s", token_pair)
+    
+    async def execute_opportunity(token_pair, opportunity):
+        """Size and execute the trade for one detected opportunity"""
+        stats['opportunities'] += 1
+        try:
+            async with trade_lock:
+                if not risk_manager.can_execute_trade():
+                    logging.warning("Trading limits reached. Waiting for reset.")
+                    return
+            
+                # Determine trade amount based on risk management
+                trade_amount = risk_manager.calculate_position_size(
+                    opportunity.profit_margin,
+                    max_trade_amount
+                )
+            
+                logging.info("Arbitrage opportunity detected for %s!", token_pair)
+                logging.info("Buy: %s @ %s", opportunity.buy_exchange, opportunity.buy_price)
+                logging.info("Sell: %s @ %s", opportunity.sell_exchange, opportunity.sell_price)
+                logging.info("Expected profit: %.2f%%", opportunity.estimated_profit_percent)
+            
+                # Execute the trade
+                success, profit = await executor.execute_arbitrage(opportunity, trade_amount)
+                stats['trades'] += 1
+            
+                # Update risk management with trade result
+                risk_manager.record_trade_result(success, profit if success else 0)
+        
+        except Exception as e:
+            logging.error("Error processing %s: %s", token_pair, e)
+    
+    logging.info("Starting arbitrage bot for agent %s", agent_name)
+    logging.info("Monitoring token pairs: %s", ", ".join(token_pairs))
+    
+    # Check all pairs against the listed markets at once, with a single warning for the unlisted ones
+    unlisted = set(token_pairs) - await fetch_available_tickers_async()
+    if unlisted:
+        logging.warning("No Injective spot market for %s; only other exchanges will be compared", ", ".join(sorted(unlisted)))
+    
+    if stream:
+        await _run_streaming(token_pairs, risk_manager, evaluate_prices, stats)
+        return
+    
+    process_tick, settle = _make_cycle(token_pairs, fetch_pair, execute_opportunity, risk_manager, stats)
+    
+    # Ticks and stats lines run on monotonic deadlines, so the cadence neither
+    # drifts by the time spent processing nor depends on wall-clock changes
+    started_at = time.monotonic()
+    next_tick_at = started_at
+    next_stats_at = started_at + STATS_INTERVAL
     
     try:
         while True:
-            for token_pair in token_pairs:
-                try:
-                    # Check if we've reached our trading limits
-                    if not risk_manager.can_execute_trade():
-                        logging.warning("Trading limits reached. Waiting for reset.")
-                        break
-                    
-                    # 1. Fetch prices across exchanges
-                    logging.info(f"Checking prices for {token_pair}...")
-                    prices = fetch_prices_across_exchanges(token_pair)
-                    
-                    if not prices:
-                        logging.warning(f"Could not fetch prices for {token_pair}")
-                        continue
-                    
-                    # 2. Detect arbitrage opportunities
-                    opportunity = detect_arbitrage_opportunity(
-                        prices, 
-                        min_profit_threshold=risk_manager.get_min_profit_threshold()
-                    )
-                    
-                    # 3. Execute trade if opportunity exists
-                    if opportunity:
-                        # Determine trade amount based on risk management
-                        trade_amount = risk_manager.calculate_position_size(
-                            opportunity['profit_margin'],
-                            max_trade_amount
-                        )
-                        
-                        logging.info(f"Arbitrage opportunity detected for {token_pair}!")
-                        logging.info(f"Buy: {opportunity['buy_exchange']} @ {opportunity['buy_price']}")
-                        logging.info(f"Sell: {opportunity['sell_exchange']} @ {opportunity['sell_price']}")
-                        logging.info(f"Expected profit: {opportunity['estimated_profit_percent']:.2f}%")
-                        
-                        # Execute the trade
-                        success, profit = executor.execute_arbitrage(opportunity, trade_amount)
-                        
-                        # Update risk management with trade result
-                        risk_manager.record_trade_result(success, profit if success else 0)
-                    else:
-                        logging.info(f"No arbitrage opportunity found for {token_pair}")
-                
-                except Exception as e:
-                    logging.error(f"Error processing {token_pair}: {e}")
+            # Process every pair concurrently, so a tick takes about as long as the slowest pair
+            if logging.getLogger().isEnabledFor(logging.DEBUG):
+                logging.debug("Checking prices for %s...", ", ".join(token_pairs))
+            await process_tick()
+            
+            now = time.monotonic()
+            if now >= next_stats_at:
+                _log_stats(stats, started_at)
+                next_stats_at = now + STATS_INTERVAL
             
-            # Wait for the next interval
-            logging.info(f"Waiting {interval} seconds until next check...")
-            time.sleep(interval)
+            # Wait for the next interval, starting right away if this tick overran it
+            next_tick_at = max(next_tick_at + interval, now)
+            logging.debug("Waiting %.1f seconds until next check...", next_tick_at - now)
+            await asyncio.sleep(next_tick_at - now)
             
-    except KeyboardInterrupt:
-        logging.info("Bot stopped by user")
     except Exception as e:
-        logging.error(f"Unexpected error: {e}")
+        logging.error("Unexpected error: %s", e)
+    finally:
+        try:
+            await settle()
+        finally:
+            await close_session()
         
 if __name__ == "__main__":
     # List of token pairs to monitor for arbitrage
     token_pairs = ["INJ/USDT", "ETH/USDT", "BTC/USDT"]
     
-    # Run the bot with the specified agent
-    run_arbitrage_bot(
-        agent_name="agent10",  # Use the agent name from your config
-        token_pairs=token_pairs,
-        interval=10,  # Check every 10 seconds (for testing)
-        max_trade_amount=1.0  # Maximum of 1 USDT per trade
-    )
\ No newline at end of file
+    # STREAM_PRICES=1 evaluates every pushed price update instead of polling on a timer
+    stream = os.getenv("STREAM_PRICES", "").lower() in ("1", "true", "yes")
+    
+    async def main():
+        # SIGTERM (docker stop, systemd) stops the bot the way Ctrl-C does: in-flight
+        # trades settle, and buffered trade logs are flushed at exit instead of lost
+        try:
+            asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, asyncio.current_task().cancel)
+        except NotImplementedError:
+            pass  # Not supported by the Windows event loop
+        
+        # Run the bot with the specified agent
+        await run_arbitrage_bot(
+            agent_name="agent10",  # Use the agent name from your config
+            token_pairs=token_pairs,
+            interval=10,  # Check every 10 seconds (for testing)
+            max_trade_amount=1.0,  # Maximum of 1 USDT per trade
+            stream=stream
+        )
+    
+    try:
+        asyncio.run(main())
+    except (KeyboardInterrupt, asyncio.CancelledError):
+        logging.info("Bot stopped")
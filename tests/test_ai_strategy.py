@@ -0,0 +1,66 @@
+import random
+import unittest
+
+import numpy as np
+
+from agent.ai_strategy import ML_AVAILABLE, SUMMARY_FEATURES, AIArbitrageStrategy
+
+def _synthetic_records(count=60, seed=7):
+    """Market data records for two exchanges with spreads straddling the training label"""
+    rng = random.Random(seed)
+    records = []
+    for _ in range(count):
+        prices = {
+            'binance': 100 * (1 + rng.uniform(-0.01, 0.01)),
+            'kucoin': 100 * (1 + rng.uniform(-0.01, 0.01)),
+        }
+        min_price, max_price = min(prices.values()), max(prices.values())
+        record = {
+            'min_price': min_price,
+            'max_price': max_price,
+            'mean_price': sum(prices.values()) / len(prices),
+            'price_spread': max_price - min_price,
+            'price_spread_percent': (max_price - min_price) / min_price * 100,
+        }
+        record.update({f'{exchange}_price': price for exchange, price in prices.items()})
+        records.append(record)
+    return records
+
+@unittest.skipUnless(ML_AVAILABLE, "scikit-learn not available")
+class TrainModelFloat32Test(unittest.TestCase):
+    """The prediction path must stay float32 after fitting, or the inline scaler silently upcasts"""
+
+    def assert_float32_pipeline(self, strategy, X):
+        self.assertEqual(strategy._scratch.dtype, np.float32)
+        self.assertEqual(strategy._mean.dtype, np.float32)
+        self.assertEqual(strategy._inv_scale.dtype, np.float32)
+
+        X_scaled = strategy.scaler.transform(X.astype(np.float32))
+        self.assertEqual(X_scaled.dtype, np.float32)
+
+        # The inline-scaled row used by predict_opportunity_success
+        row = (strategy._scratch - strategy._mean) * strategy._inv_scale
+        self.assertEqual(row.dtype, np.float32)
+
+    def test_labeled_data(self):
+        strategy = AIArbitrageStrategy()
+        records = _synthetic_records()
+        self.assertTrue(strategy.train_model(records))
+
+        _, X = strategy._build_training_matrix(records)
+        self.assert_float32_pipeline(strategy, X)
+
+    def test_recorded_history(self):
+        strategy = AIArbitrageStrategy()
+        for record in _synthetic_records():
+            strategy.record_market_data("INJ/USDT", {
+                'binance': record['binance_price'], 'kucoin': record['kucoin_price']
+            })
+        self.assertEqual(strategy._hist.dtype, np.float32)
+        self.assertTrue(strategy.train_model())
+
+        self.assert_float32_pipeline(strategy, strategy._hist[:strategy._count])
+        self.assertEqual(strategy.feature_names[:len(SUMMARY_FEATURES)], SUMMARY_FEATURES)
+
+if __name__ == "__main__":
+    unittest.main()